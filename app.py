@@ -1,26 +1,186 @@
 # app.py - Yellow Money Heist Investment Platform
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Response, make_response, render_template, request, redirect, url_for, session, flash, jsonify, get_flashed_messages, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_caching import Cache
+from flask_compress import Compress
+from jinja2 import FileSystemBytecodeCache
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import os
 import secrets
-from datetime import datetime, timedelta
-import uuid
-import re
+from datetime import date, datetime, timedelta
 import logging
-from functools import wraps
+import sqlite3
+import threading
+import hashlib
+import re
+import gzip
+import fcntl
+import brotli
+from functools import wraps, lru_cache
+from sqlalchemy import create_engine, event, func, select, update, bindparam, inspect, text
+from sqlalchemy.orm import aliased, scoped_session, sessionmaker
+from sqlalchemy.engine import Engine
 
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(32)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///yellowmoney.db'
+# Shared across workers so sessions signed by one worker validate on the others
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///yellowmoney.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+# Secure by default; set SESSION_COOKIE_SECURE=0 when serving plain HTTP (e.g. behind a local proxy)
+app.config['SESSION_COOKIE_SECURE'] = os.environ.get('SESSION_COOKIE_SECURE', '1') == '1'
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+# Templates only change on deploy, so skip the per-render mtime check
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+# Streamed pages would be buffered whole to compress them, so those are left to the reverse
+# proxy; static CSS/JS is served precompressed by cache_static_assets
+app.config['COMPRESS_STREAMS'] = False
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True
+}
 db = SQLAlchemy(app)
 
+# Templates live in templates/; compiled templates are kept for the process lifetime
+# and their bytecode is cached across restarts (in JINJA_BC_DIR when set)
+JINJA_BC_DIR = os.environ.get('JINJA_BC_DIR')
+if JINJA_BC_DIR:
+    os.makedirs(JINJA_BC_DIR, exist_ok=True)
+
+class StripIndentExtension(Extension):
+    # Drops indentation, trailing spaces and blank lines from template source before it is
+    # compiled, so pages are served without them; line breaks stay for the inline scripts
+    def preprocess(self, source, name, filename=None):
+        return re.sub(r'[ \t]+$', '', re.sub(r'^\s+', '', source, flags=re.M), flags=re.M)
+
+# Cached bytecode is keyed on template source only, so the pattern changes with the options above
+app.jinja_options = {
+    'bytecode_cache': FileSystemBytecodeCache(directory=JINJA_BC_DIR, pattern='__jinja2_stripped_%s.cache'),
+    'cache_size': -1,
+    'extensions': [StripIndentExtension],
+    'trim_blocks': True
+}
+
+# Static assets are fingerprinted with a content hash, so browsers may cache them forever
+@lru_cache(maxsize=None)
+def static_file_hash(filename):
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()[:12]
+
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['v'] = static_file_hash(values['filename'])
+
+def minify_css(css):
+    # Strip comments and whitespace; enough for the hand-written stylesheets in static/css
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};:,>])\s*', r'\1', css).replace(';}', '}').strip()
+
+# Text assets are compressed once per process, at the highest levels, instead of per response
+@lru_cache(maxsize=None)
+def precompressed_static(filename):
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        data = f.read()
+    if filename.endswith('.css'):
+        data = minify_css(data.decode('utf-8')).encode('utf-8')
+    variants = {'br': brotli.compress(data, quality=11), 'gzip': gzip.compress(data, 9), 'identity': data}
+    # Each variant is tagged from its own bytes, not from the file on disk
+    return {encoding: (body, hashlib.md5(body).hexdigest()) for encoding, body in variants.items()}
+
+@app.after_request
+def cache_static_assets(response):
+    if request.endpoint == 'static':
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+        
+        filename = request.view_args['filename']
+        if filename.endswith(('.css', '.js')):
+            response.vary.add('Accept-Encoding')
+            # send_file answered ranges and revalidations against the raw file, so redo them here
+            if response.status_code in (200, 206, 304, 416):
+                # Every encoding carries the same minified body, whole; ranges would slice a different one
+                encoding = request.accept_encodings.best_match(('br', 'gzip')) or 'identity'
+                body, etag = precompressed_static(filename)[encoding]
+                response.response.close()
+                response.direct_passthrough = False
+                response.status_code = 200
+                response.headers.pop('Content-Range', None)
+                response.headers.pop('Accept-Ranges', None)
+                response.set_data(body)
+                if encoding != 'identity':
+                    response.headers['Content-Encoding'] = encoding
+                response.set_etag(etag)
+                response.make_conditional(request.environ)
+    return response
+
+# Optional Redis backend for server-side state (sessions, cache)
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(REDIS_URL)
+    app.config['SESSION_USE_SIGNER'] = True
+    Session(app)
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = REDIS_URL
+else:
+    app.config['CACHE_TYPE'] = 'SimpleCache'
+cache = Cache(app)
+
+# SimpleCache is per worker, so delete_memoized in one leaves the others' copies stale;
+# without Redis, memoized reads only live for a few seconds
+def memo_timeout(seconds):
+    return seconds if REDIS_URL else min(seconds, 5)
+Compress(app)
+
+# SQLite tuning: WAL lets readers run alongside the single writer
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI']:
+        cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-20000')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+# Read-only pool for GET pages and API lookups, so reads never queue behind writers
+with app.app_context():
+    read_engine = create_engine(db.engine.url, pool_size=16, max_overflow=0, pool_pre_ping=True)
+read_session = scoped_session(sessionmaker(bind=read_engine))
+
+@event.listens_for(read_engine, 'connect')
+def set_read_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA query_only=1')
+    cursor.close()
+
+@app.teardown_appcontext
+def remove_read_session(exception=None):
+    read_session.remove()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('YellowMoneyHeist')
 
+if 'SECRET_KEY' not in os.environ:
+    logger.warning('SECRET_KEY is not set; using a random key, sessions will not survive restarts or span workers')
+
 # Database Models
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,11 +190,20 @@ class User(db.Model):
     phone = db.Column(db.String(20))
     verified = db.Column(db.Boolean, default=False)
     referral_code = db.Column(db.String(10), unique=True)
-    referred_by = db.Column(db.String(10))
+    referred_by = db.Column(db.String(10), index=True)
+    referred_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # Running totals, updated in the same commit as the rows they summarise
+    balance_cache = db.Column(db.Float, nullable=False, default=0)
+    referral_earnings_cache = db.Column(db.Float, nullable=False, default=0)
+    total_invested_cache = db.Column(db.Float, nullable=False, default=0)
 
 class Investment(db.Model):
+    __table_args__ = (
+        db.Index('ix_inv_user_active', 'user_id', 'active'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -44,6 +213,11 @@ class Investment(db.Model):
     active = db.Column(db.Boolean, default=True)
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_tx_user_created', 'user_id', 'created_at'),
+        db.Index('ix_tx_user_type_status', 'user_id', 'type', 'status'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -56,11 +230,28 @@ class Transaction(db.Model):
 
 class Payout(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    investment_id = db.Column(db.Integer, db.ForeignKey('investment.id'), nullable=False)
+    investment_id = db.Column(db.Integer, db.ForeignKey('investment.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     payout_date = db.Column(db.DateTime, default=datetime.utcnow)
 
 # Helper Functions
+password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+def verify_password(password_hash, password):
+    # Accounts created before argon2 still carry werkzeug pbkdf2 hashes
+    if not password_hash.startswith('$argon2'):
+        return check_password_hash(password_hash, password)
+    try:
+        return password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(password_hash):
+    return not password_hash.startswith('$argon2') or password_hasher.check_needs_rehash(password_hash)
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -69,50 +260,274 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@cache.memoize(timeout=memo_timeout(30))
+def username_exists(username):
+    return read_session.query(select(User.id).filter_by(username=username).exists()).scalar()
+
+@cache.memoize(timeout=memo_timeout(30))
+def email_exists(email):
+    return read_session.query(select(User.id).filter_by(email=email).exists()).scalar()
+
+def stream_page(template_name, buffer_size=10, **context):
+    # The session cookie goes out before a streamed body, so consume flashes now
+    get_flashed_messages()
+    app.update_template_context(context)
+    # Buffer a few template events per chunk so row loops don't send tiny writes
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(buffer_size)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+@lru_cache(maxsize=None)
+def prerender_page(template_name, year):
+    # Pages without per-user content are rendered, encoded and compressed once per process (and year)
+    html = render_template(template_name).encode('utf-8')
+    return html, {'br': brotli.compress(html, quality=11), 'gzip': gzip.compress(html, 9)}
+
+@lru_cache(maxsize=None)
+def render_fragment(template_name, year):
+    return Markup(render_template(template_name))
+
+def layout_fragment(template_name, year=None):
+    # Header and footer markup only depends on constants (and the year), so it is rendered once per process
+    if app.config['TEMPLATES_AUTO_RELOAD']:
+        return Markup(render_template(template_name))
+    return render_fragment(template_name, year)
+
+def prerendered_page(template_name):
+    if app.config['TEMPLATES_AUTO_RELOAD']:
+        return render_template(template_name)
+    html, compressed = prerender_page(template_name, datetime.now().year)
+    # Every variant is ready-made bytes, so nothing is encoded or compressed per request
+    encoding = request.accept_encodings.best_match(('br', 'gzip'))
+    response = Response(compressed[encoding] if encoding else html, mimetype='text/html')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    return response
+
+# A deploy that changes templates or assets changes every page, so it's part of each ETag
+def source_digest(*folders):
+    digest = hashlib.md5()
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, folder).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+ASSET_VERSION = os.environ.get('BUILD_ID') or source_digest(
+    os.path.join(app.root_path, app.template_folder), app.static_folder
+)
+
+def page_etag(*parts):
+    # Pages show pending flashes, so only a page without any can be answered with a 304
+    if session.get('_flashes'):
+        return None
+    return hashlib.md5(repr((ASSET_VERSION, session.get('username')) + parts).encode()).hexdigest()
+
+def not_modified(etag):
+    # Flask-Compress tags compressed variants as "<etag>:<algorithm>"
+    return etag is not None and any(
+        tag.split(':')[0] == etag for tag in request.if_none_match.as_set(include_weak=True)
+    )
+
+def revalidated(response, etag):
+    # Browsers keep the page (and back/forward cache works) but check with us before reuse
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+# Random bytes for transaction references are read from the OS in bulk
+_reference_pool = threading.local()
+os.register_at_fork(after_in_child=lambda: _reference_pool.__dict__.clear())
+
+def generate_reference(prefix):
+    buf = getattr(_reference_pool, 'buf', b'')
+    if len(buf) < 5:
+        buf = os.urandom(4096)
+    _reference_pool.buf = buf[5:]
+    return f'{prefix}-{buf[:5].hex().upper()}'
+
+def referral_count_subquery():
+    # Correlated COUNT of users referred by the enclosing query's User (uses ix_user_referred_by)
+    referred = aliased(User)
+    return select(func.count(referred.id)).where(
+        referred.referred_by == User.referral_code
+    ).scalar_subquery()
+
 def generate_referral_code():
-    return str(uuid.uuid4())[:8].upper()
+    return secrets.token_hex(4).upper()
+
+@cache.memoize(timeout=1)
+def dashboard_data(user_id):
+    # Load the user and all stat-card numbers in one round-trip (plain columns so the result can be cached)
+    active_count = select(func.count(Investment.id)).where(
+        Investment.user_id == User.id, Investment.active == True
+    ).scalar_subquery()
+    user = read_session.query(
+        User.id,
+        User.username,
+        User.verified,
+        User.total_invested_cache,
+        active_count.label('active_count'),
+        referral_count_subquery().label('referral_count')
+    ).filter(User.id == user_id).first()
+    
+    # Get the newest active investments (only the columns the template reads, dates formatted by SQLite)
+    investments = read_session.query(
+        Investment.id,
+        Investment.amount,
+        Investment.plan,
+        func.strftime('%Y-%m-%d', Investment.start_date).label('start_date_str'),
+        func.strftime(
+            '%Y-%m-%d', func.coalesce(Investment.last_payout, Investment.start_date), '+7 days'
+        ).label('next_payout_str')
+    ).filter_by(user_id=user_id, active=True).order_by(Investment.start_date.desc()).limit(10).all()
+    
+    # Get recent transactions
+    transactions = read_session.execute(
+        select(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.type,
+            Transaction.status,
+            func.strftime('%Y-%m-%d %H:%M', Transaction.created_at).label('created_at_str')
+        )
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc())
+        .limit(5)
+    ).all()
+    
+    return user, investments, transactions
+
+@cache.memoize(timeout=memo_timeout(60))
+def referrals_data(user_id):
+    # Only changes when a referral signs up or pays, and both paths clear it (in every worker with Redis)
+    user = read_session.query(
+        User.id,
+        User.referral_code,
+        User.referral_earnings_cache,
+        referral_count_subquery().label('referral_count')
+    ).filter(User.id == user_id).first()
+    
+    # Get referral stats (most recent referrals only; the count covers all of them)
+    referred_users = read_session.query(
+        User.username, User.created_at, User.verified
+    ).filter_by(referred_by=user.referral_code).order_by(User.created_at.desc()).limit(100).all()
+    referral_earnings = read_session.query(
+        Transaction.created_at, Transaction.amount, Transaction.reference
+    ).filter_by(
+        user_id=user_id, 
+        type='referral', 
+        status='completed'
+    ).all()
+    
+    return user, referred_users, referral_earnings
 
 def calculate_weekly_payout(investment):
     return investment.amount * 0.01  # 1% weekly
 
 def process_weekly_payouts():
     with app.app_context():
-        active_investments = Investment.query.filter_by(active=True).all()
-        for investment in active_investments:
-            # Check if it's time for a payout (weekly)
-            last_payout = investment.last_payout or investment.start_date
-            if datetime.utcnow() >= last_payout + timedelta(days=7):
-                payout_amount = calculate_weekly_payout(investment)
-                
-                # Create payout record
-                payout = Payout(
-                    investment_id=investment.id,
-                    amount=payout_amount
-                )
-                db.session.add(payout)
-                
-                # Update investment
-                investment.last_payout = datetime.utcnow()
-                
-                # Create transaction
-                transaction = Transaction(
-                    user_id=investment.user_id,
-                    amount=payout_amount,
-                    type='payout',
-                    status='completed',
-                    reference=f'PYT-{secrets.token_hex(5).upper()}'
-                )
-                db.session.add(transaction)
-                
-                db.session.commit()
-                logger.info(f"Processed payout of ${payout_amount} for investment {investment.id}")
+        now = datetime.utcnow()
+        
+        # Only fetch investments that are due a payout (weekly)
+        due_investments = Investment.query.filter(
+            Investment.active == True,
+            func.coalesce(Investment.last_payout, Investment.start_date) <= now - timedelta(days=7)
+        ).all()
+        if not due_investments:
+            return
+        
+        records = []
+        user_payouts = {}
+        for investment in due_investments:
+            payout_amount = calculate_weekly_payout(investment)
+            user_payouts[investment.user_id] = user_payouts.get(investment.user_id, 0) + payout_amount
+            
+            # Create payout record
+            records.append(Payout(
+                investment_id=investment.id,
+                amount=payout_amount,
+                payout_date=now
+            ))
+            
+            # Create transaction
+            records.append(Transaction(
+                user_id=investment.user_id,
+                amount=payout_amount,
+                type='payout',
+                status='completed',
+                reference=generate_reference('PYT')
+            ))
+        db.session.add_all(records)
+        
+        # Update investments
+        investment_ids = [investment.id for investment in due_investments]
+        db.session.execute(
+            update(Investment).where(Investment.id.in_(investment_ids)).values(last_payout=now)
+        )
+        
+        # Credit user balances
+        users = User.__table__
+        db.session.execute(
+            users.update()
+            .where(users.c.id == bindparam('user_id'))
+            .values(balance_cache=users.c.balance_cache + bindparam('amount')),
+            [{'user_id': user_id, 'amount': amount} for user_id, amount in user_payouts.items()]
+        )
+        
+        # Single commit for the whole batch
+        db.session.commit()
+        logger.info(f"Processed {len(investment_ids)} weekly payouts")
+
+def run_weekly_payouts():
+    # Every worker may schedule the job; a lock file next to the database lets only one run it.
+    # The instance folder only exists already when the database lives in it
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'payouts.lock'), 'w') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("Weekly payouts already running in another process")
+            return
+        process_weekly_payouts()
+
+# Background Jobs: with a broker configured, Celery beat runs payouts off the web process
+if REDIS_URL:
+    from celery import Celery
+    from celery.schedules import crontab
+    celery = Celery(app.import_name, broker=REDIS_URL)
+    celery.conf.task_acks_late = True
+    celery.conf.beat_schedule = {
+        'payouts-weekly': {
+            'task': 'process_weekly_payouts',
+            'schedule': crontab(hour=0, minute=5)
+        }
+    }
+    process_weekly_payouts_task = celery.task(name='process_weekly_payouts')(run_weekly_payouts)
+else:
+    # Otherwise an in-process scheduler fires the same daily check (it sleeps until then).
+    # Importing the app doesn't start it: the gunicorn master does (when_ready), as do the
+    # development server and RUN_SCHEDULER=1
+    from apscheduler.schedulers.background import BackgroundScheduler
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(run_weekly_payouts, 'cron', hour=0, minute=5, id='payouts', replace_existing=True)
+    if os.environ.get('RUN_SCHEDULER') == '1':
+        scheduler.start()
 
 # Routes
 @app.route('/')
 def home():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
-    return render_template('home.html')
+    return prerendered_page('home.html')
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -137,8 +552,11 @@ def register():
             return redirect(url_for('register'))
         
         # Create user
-        hashed_password = generate_password_hash(password)
+        hashed_password = hash_password(password)
         user_referral_code = generate_referral_code()
+        referrer_id = None
+        if referral_code:
+            referrer_id = db.session.query(User.id).filter_by(referral_code=referral_code).scalar()
         
         user = User(
             username=username,
@@ -146,11 +564,16 @@ def register():
             password=hashed_password,
             phone=phone,
             referral_code=user_referral_code,
-            referred_by=referral_code if referral_code else None
+            referred_by=referral_code if referral_code else None,
+            referred_by_id=referrer_id
         )
         
         db.session.add(user)
         db.session.commit()
+        cache.delete_memoized(username_exists, username)
+        cache.delete_memoized(email_exists, email)
+        if referrer_id:
+            cache.delete_memoized(referrals_data, referrer_id)
         
         # Log in user
         session['user_id'] = user.id
@@ -160,7 +583,10 @@ def register():
         flash('Registration successful!', 'success')
         return redirect(url_for('dashboard'))
     
-    return render_template('register.html')
+    # Never keep the form (or what was typed into it) in a browser or proxy cache
+    response = make_response(render_template('register.html'))
+    response.cache_control.no_store = True
+    return response
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -168,14 +594,18 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
-        user = User.query.filter_by(username=username).first()
+        # Only fetch what is needed to verify the password
+        user = db.session.query(User.id, User.username, User.password).filter_by(username=username).first()
         
-        if user and check_password_hash(user.password, password):
+        if user and verify_password(user.password, password):
             session['user_id'] = user.id
             session['username'] = user.username
             session.permanent = True
             
-            user.last_login = datetime.utcnow()
+            values = {'last_login': datetime.utcnow()}
+            if password_needs_rehash(user.password):
+                values['password'] = hash_password(password)
+            db.session.execute(update(User).where(User.id == user.id).values(**values))
             db.session.commit()
             
             flash('Login successful!', 'success')
@@ -184,7 +614,10 @@ def login():
         flash('Invalid username or password', 'error')
         return redirect(url_for('login'))
     
-    return render_template('login.html')
+    # Never keep the form (or what was typed into it) in a browser or proxy cache
+    response = make_response(render_template('login.html'))
+    response.cache_control.no_store = True
+    return response
 
 @app.route('/logout')
 def logout():
@@ -195,26 +628,20 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    user = User.query.get(session['user_id'])
-    
-    # Get active investments
-    investments = Investment.query.filter_by(user_id=user.id, active=True).all()
-    
-    # Calculate total invested
-    total_invested = sum(inv.amount for inv in investments)
-    
-    # Get recent transactions
-    transactions = Transaction.query.filter_by(user_id=user.id).order_by(Transaction.created_at.desc()).limit(5).all()
+    # Repeated reloads inside the throttle window reuse the same query results
+    user, investments, transactions = dashboard_data(session['user_id'])
+    etag = page_etag(user, investments, transactions)
+    if not_modified(etag):
+        return revalidated(Response(status=304), etag)
     
-    # Get referral count (simplified)
-    referral_count = User.query.filter_by(referred_by=user.referral_code).count()
-    
-    return render_template('dashboard.html', 
-                         user=user,
-                         investments=investments,
-                         total_invested=total_invested,
-                         transactions=transactions,
-                         referral_count=referral_count)
+    response = stream_page('dashboard.html',
+                           user=user,
+                           investments=investments,
+                           total_invested=user.total_invested_cache,
+                           transactions=transactions,
+                           active_count=user.active_count,
+                           referral_count=user.referral_count)
+    return revalidated(response, etag)
 
 @app.route('/invest', methods=['GET', 'POST'])
 @login_required
@@ -244,11 +671,17 @@ def invest():
             type='deposit',
             status='pending',
             payment_method='pending',
-            reference=f'INV-{secrets.token_hex(5).upper()}'
+            reference=generate_reference('INV')
         )
         db.session.add(transaction)
         
+        db.session.execute(
+            update(User)
+            .where(User.id == session['user_id'])
+            .values(total_invested_cache=User.total_invested_cache + amount)
+        )
         db.session.commit()
+        cache.delete_memoized(dashboard_data, session['user_id'])
         
         flash('Investment created successfully! Please complete payment', 'success')
         return redirect(url_for('payment', transaction_id=transaction.id))
@@ -258,48 +691,66 @@ def invest():
 @app.route('/payment/<int:transaction_id>', methods=['GET', 'POST'])
 @login_required
 def payment(transaction_id):
-    transaction = Transaction.query.get_or_404(transaction_id)
-    
-    if transaction.user_id != session['user_id'] or transaction.type != 'deposit' or transaction.status != 'pending':
-        flash('Invalid payment request', 'error')
-        return redirect(url_for('dashboard'))
-    
     if request.method == 'POST':
         payment_method = request.form.get('payment_method')
         
         if payment_method not in ['visa', 'mtn']:
             flash('Invalid payment method', 'error')
-            return redirect(url_for('payment', transaction_id=transaction.id))
+            return redirect(url_for('payment', transaction_id=transaction_id))
         
         # In a real app, you would integrate with payment processors here
         # For demo, we'll just mark as completed
         
-        transaction.status = 'completed'
-        transaction.payment_method = payment_method
-        transaction.completed_at = datetime.utcnow()
+        # Validate and complete in one statement so a payment can't be completed twice
+        completed = db.session.execute(
+            update(Transaction)
+            .where(
+                Transaction.id == transaction_id,
+                Transaction.user_id == session['user_id'],
+                Transaction.type == 'deposit',
+                Transaction.status == 'pending'
+            )
+            .values(status='completed', payment_method=payment_method, completed_at=datetime.utcnow())
+            .returning(Transaction.amount)
+        ).first()
+        if completed is None:
+            db.session.rollback()
+            flash('Invalid payment request', 'error')
+            return redirect(url_for('dashboard'))
         
         # If this was a referral, process referral bonus
-        user = User.query.get(session['user_id'])
-        if user.referred_by:
-            referrer = User.query.filter_by(referral_code=user.referred_by).first()
-            if referrer:
-                referral_bonus = transaction.amount * 0.05  # 5% referral bonus
-                referral_transaction = Transaction(
-                    user_id=referrer.id,
-                    amount=referral_bonus,
-                    type='referral',
-                    status='completed',
-                    payment_method='system',
-                    reference=f'REF-{secrets.token_hex(5).upper()}'
-                )
-                db.session.add(referral_transaction)
-                flash(f'Referral bonus of ${referral_bonus:.2f} credited to your referrer!', 'info')
+        referrer_id = db.session.query(User.referred_by_id).filter_by(id=session['user_id']).scalar()
+        if referrer_id:
+            referral_bonus = completed.amount * 0.05  # 5% referral bonus
+            referral_transaction = Transaction(
+                user_id=referrer_id,
+                amount=referral_bonus,
+                type='referral',
+                status='completed',
+                payment_method='system',
+                reference=generate_reference('REF')
+            )
+            db.session.add(referral_transaction)
+            db.session.execute(
+                update(User)
+                .where(User.id == referrer_id)
+                .values(referral_earnings_cache=User.referral_earnings_cache + referral_bonus)
+            )
         
         db.session.commit()
+        cache.delete_memoized(dashboard_data, session['user_id'])
+        if referrer_id:
+            cache.delete_memoized(referrals_data, referrer_id)
         
         flash('Payment completed successfully! Your investment is now active.', 'success')
         return redirect(url_for('dashboard'))
     
+    transaction = Transaction.query.get_or_404(transaction_id)
+    
+    if transaction.user_id != session['user_id'] or transaction.type != 'deposit' or transaction.status != 'pending':
+        flash('Invalid payment request', 'error')
+        return redirect(url_for('dashboard'))
+    
     return render_template('payment.html', transaction=transaction)
 
 @app.route('/withdraw', methods=['GET', 'POST'])
@@ -325,30 +776,24 @@ def withdraw():
             type='withdrawal',
             status='pending',
             payment_method=method,
-            reference=f'WDR-{secrets.token_hex(5).upper()}'
+            reference=generate_reference('WDR')
         )
         db.session.add(transaction)
         db.session.commit()
+        cache.delete_memoized(dashboard_data, session['user_id'])
         
         flash('Withdrawal request submitted. It will be processed within 24 hours.', 'success')
         return redirect(url_for('dashboard'))
     
-    # Calculate available balance (simplified)
-    user = User.query.get(session['user_id'])
-    payouts = Payout.query.join(Investment).filter(Investment.user_id == user.id).all()
-    total_payouts = sum(p.amount for p in payouts)
-    
-    # Get referral earnings
-    referral_earnings = Transaction.query.filter_by(
-        user_id=user.id, 
-        type='referral', 
-        status='completed'
-    ).all()
-    total_referrals = sum(t.amount for t in referral_earnings)
-    
-    available_balance = total_payouts + total_referrals
+    # Calculate available balance (simplified): payouts plus referral earnings
+    available_balance = read_session.query(
+        User.balance_cache + User.referral_earnings_cache
+    ).filter_by(id=session['user_id']).scalar()
+    etag = page_etag(available_balance)
+    if not_modified(etag):
+        return revalidated(Response(status=304), etag)
     
-    return render_template('withdraw.html', available_balance=available_balance)
+    return revalidated(make_response(render_template('withdraw.html', available_balance=available_balance)), etag)
 
 @app.route('/kyc', methods=['GET', 'POST'])
 @login_required
@@ -363,34 +808,30 @@ def kyc():
 @app.route('/referrals')
 @login_required
 def referrals():
-    user = User.query.get(session['user_id'])
+    user, referred_users, referral_earnings = referrals_data(session['user_id'])
+    etag = page_etag(user, referred_users, referral_earnings)
+    if not_modified(etag):
+        return revalidated(Response(status=304), etag)
     
-    # Get referral stats
-    referred_users = User.query.filter_by(referred_by=user.referral_code).all()
-    referral_earnings = Transaction.query.filter_by(
-        user_id=user.id, 
-        type='referral', 
-        status='completed'
-    ).all()
-    total_earned = sum(t.amount for t in referral_earnings)
-    
-    return render_template('referrals.html', 
-                         user=user,
-                         referred_users=referred_users,
-                         referral_earnings=referral_earnings,
-                         total_earned=total_earned)
+    response = stream_page('referrals.html',
+                           user=user,
+                           referral_count=user.referral_count,
+                           referred_users=referred_users,
+                           referral_earnings=referral_earnings,
+                           total_earned=user.referral_earnings_cache)
+    return revalidated(response, etag)
 
 # API Endpoints
 @app.route('/api/check_username')
 def check_username():
     username = request.args.get('username')
-    exists = User.query.filter_by(username=username).first() is not None
+    exists = username_exists(username)
     return jsonify({'exists': exists})
 
 @app.route('/api/check_email')
 def check_email():
     email = request.args.get('email')
-    exists = User.query.filter_by(email=email).first() is not None
+    exists = email_exists(email)
     return jsonify({'exists': exists})
 
 # Error Handlers
@@ -402,1673 +843,123 @@ def page_not_found(e):
 def internal_server_error(e):
     return render_template('500.html'), 500
 
-# Templates (embedded in Python for single-file deployment)
-@app.context_processor
-def inject_globals():
-    return {
-        'site_name': 'Yellow Money Heist',
-        'current_year': datetime.now().year,
-        'support_email': 'yellowmoneyheist@gmail.com',
-        'support_phone': '+2560706322145',
-        'mtn_account': '0768568972'
+# Template Globals
+SITE_NAME = 'Yellow Money Heist'
+SUPPORT_EMAIL = 'yellowmoneyheist@gmail.com'
+SUPPORT_PHONE = '+2560706322145'
+MTN_ACCOUNT = '0768568972'
+
+# Constants live in the environment globals rather than being merged into every context
+app.jinja_env.globals.update(
+    site_name=SITE_NAME,
+    support_email=SUPPORT_EMAIL,
+    support_phone=SUPPORT_PHONE,
+    mtn_account=MTN_ACCOUNT
+)
+
+# Above-the-fold rules are inlined into pages; the rest of the CSS loads without blocking render
+@lru_cache(maxsize=None)
+def inline_css(filename):
+    with open(os.path.join(app.static_folder, filename)) as f:
+        return Markup(minify_css(f.read()))
+
+# Most responses have no flash messages, so the common case is a single empty check
+def flash_html():
+    messages = get_flashed_messages(with_categories=True)
+    if not messages:
+        return ''
+    alert = Markup('<div class="alert alert-{}">{}</div>')
+    return Markup('').join(alert.format(category, message) for category, message in messages)
+
+app.jinja_env.globals.update(inline_css=inline_css, layout_fragment=layout_fragment, flash_html=flash_html)
+
+# Routes without arguments always build the same path, so templates read them from a dict
+with app.test_request_context():
+    app.jinja_env.globals['urls'] = {
+        rule.endpoint: url_for(rule.endpoint)
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != 'static' and not rule.arguments
     }
 
-def render_template(template_name, **context):
-    templates = {
-        'home.html': '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{{ site_name }} - Smart Investments</title>
-    <style>
-        :root {
-            --primary: #FFD700;
-            --secondary: #000;
-            --accent: #FFA500;
-            --light: #FFF8DC;
-            --dark: #333;
-        }
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }
-        body {
-            background-color: #f5f5f5;
-            color: var(--dark);
-            line-height: 1.6;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-        header {
-            background-color: var(--primary);
-            color: var(--secondary);
-            padding: 20px 0;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        nav {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        .logo {
-            font-size: 24px;
-            font-weight: bold;
-            color: var(--secondary);
-            text-decoration: none;
-        }
-        .nav-links {
-            display: flex;
-            gap: 20px;
-        }
-        .nav-links a {
-            color: var(--secondary);
-            text-decoration: none;
-            font-weight: 500;
-        }
-        .nav-links a:hover {
-            color: var(--accent);
-        }
-        .auth-buttons {
-            display: flex;
-            gap: 10px;
-        }
-        .btn {
-            padding: 10px 20px;
-            border-radius: 5px;
-            text-decoration: none;
-            font-weight: 500;
-            transition: all 0.3s ease;
-        }
-        .btn-primary {
-            background-color: var(--secondary);
-            color: white;
-        }
-        .btn-outline {
-            border: 1px solid var(--secondary);
-            color: var(--secondary);
-        }
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }
-        .hero {
-            padding: 80px 0;
-            text-align: center;
-            background: linear-gradient(rgba(255, 215, 0, 0.1), rgba(255, 215, 0, 0.1)), url('https://via.placeholder.com/1200x400') no-repeat center center/cover;
-        }
-        .hero h1 {
-            font-size: 48px;
-            margin-bottom: 20px;
-            color: var(--secondary);
-        }
-        .hero p {
-            font-size: 20px;
-            max-width: 800px;
-            margin: 0 auto 30px;
-            color: var(--dark);
-        }
-        .plans {
-            padding: 60px 0;
-            background-color: white;
-        }
-        .section-title {
-            text-align: center;
-            margin-bottom: 40px;
-            font-size: 36px;
-            color: var(--secondary);
-        }
-        .plan-cards {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 30px;
-        }
-        .plan-card {
-            background-color: var(--light);
-            border-radius: 10px;
-            padding: 30px;
-            text-align: center;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-            transition: all 0.3s ease;
-        }
-        .plan-card:hover {
-            transform: translateY(-10px);
-            box-shadow: 0 15px 30px rgba(0,0,0,0.1);
-        }
-        .plan-card h3 {
-            font-size: 24px;
-            margin-bottom: 15px;
-            color: var(--secondary);
-        }
-        .plan-card .price {
-            font-size: 36px;
-            font-weight: bold;
-            color: var(--accent);
-            margin-bottom: 20px;
-        }
-        .plan-card .features {
-            margin-bottom: 30px;
-            text-align: left;
-        }
-        .plan-card .features li {
-            margin-bottom: 10px;
-            list-style-type: none;
-            padding-left: 25px;
-            position: relative;
-        }
-        .plan-card .features li:before {
-            content: '✓';
-            position: absolute;
-            left: 0;
-            color: var(--accent);
-            font-weight: bold;
-        }
-        footer {
-            background-color: var(--secondary);
-            color: white;
-            padding: 40px 0;
-            text-align: center;
-        }
-        .footer-links {
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .footer-links a {
-            color: white;
-            text-decoration: none;
-        }
-        .footer-links a:hover {
-            color: var(--primary);
-        }
-        .social-links {
-            display: flex;
-            justify-content: center;
-            gap: 15px;
-            margin-bottom: 20px;
-        }
-        .social-links a {
-            color: white;
-            font-size: 20px;
-        }
-        .copyright {
-            font-size: 14px;
-            opacity: 0.8;
-        }
-        @media (max-width: 768px) {
-            .nav-links {
-                display: none;
-            }
-            .hero h1 {
-                font-size: 36px;
-            }
-            .hero p {
-                font-size: 18px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <header>
-        <div class="container">
-            <nav>
-                <a href="{{ url_for('home') }}" class="logo">{{ site_name }}</a>
-                <div class="nav-links">
-                    <a href="#how-it-works">How It Works</a>
-                    <a href="#plans">Investment Plans</a>
-                    <a href="#testimonials">Testimonials</a>
-                    <a href="#faq">FAQ</a>
-                </div>
-                <div class="auth-buttons">
-                    <a href="{{ url_for('login') }}" class="btn btn-outline">Login</a>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Register</a>
-                </div>
-            </nav>
-        </div>
-    </header>
-
-    <section class="hero">
-        <div class="container">
-            <h1>Earn 1% Weekly Returns on Your Investments</h1>
-            <p>Join thousands of investors who are growing their wealth with our proven investment platform. Start with as little as $5 and watch your money grow.</p>
-            <div>
-                <a href="{{ url_for('register') }}" class="btn btn-primary">Get Started Now</a>
-            </div>
-        </div>
-    </section>
-
-    <section id="how-it-works" class="container" style="padding: 60px 0;">
-        <h2 class="section-title">How Yellow Money Heist Works</h2>
-        <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 30px;">
-            <div style="text-align: center; padding: 20px;">
-                <div style="font-size: 48px; margin-bottom: 15px; color: var(--accent);">1</div>
-                <h3 style="margin-bottom: 15px;">Create Account</h3>
-                <p>Sign up in minutes with your basic information and verify your account.</p>
-            </div>
-            <div style="text-align: center; padding: 20px;">
-                <div style="font-size: 48px; margin-bottom: 15px; color: var(--accent);">2</div>
-                <h3 style="margin-bottom: 15px;">Choose Investment Plan</h3>
-                <p>Select from our range of investment plans that fit your budget.</p>
-            </div>
-            <div style="text-align: center; padding: 20px;">
-                <div style="font-size: 48px; margin-bottom: 15px; color: var(--accent);">3</div>
-                <h3 style="margin-bottom: 15px;">Make Deposit</h3>
-                <p>Fund your account using Visa card or MTN mobile money.</p>
-            </div>
-            <div style="text-align: center; padding: 20px;">
-                <div style="font-size: 48px; margin-bottom: 15px; color: var(--accent);">4</div>
-                <h3 style="margin-bottom: 15px;">Earn Weekly</h3>
-                <p>Receive 1% of your investment every week automatically.</p>
-            </div>
-        </div>
-    </section>
-
-    <section id="plans" class="plans">
-        <div class="container">
-            <h2 class="section-title">Investment Plans</h2>
-            <div class="plan-cards">
-                <div class="plan-card">
-                    <h3>Starter</h3>
-                    <div class="price">$5</div>
-                    <ul class="features">
-                        <li>1% Weekly Returns</li>
-                        <li>Flexible Withdrawals</li>
-                        <li>24/7 Support</li>
-                        <li>Basic Account</li>
-                    </ul>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Get Started</a>
-                </div>
-                <div class="plan-card">
-                    <h3>Basic</h3>
-                    <div class="price">$10</div>
-                    <ul class="features">
-                        <li>1% Weekly Returns</li>
-                        <li>Flexible Withdrawals</li>
-                        <li>Priority Support</li>
-                        <li>Standard Account</li>
-                    </ul>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Get Started</a>
-                </div>
-                <div class="plan-card">
-                    <h3>Premium</h3>
-                    <div class="price">$20</div>
-                    <ul class="features">
-                        <li>1% Weekly Returns</li>
-                        <li>Flexible Withdrawals</li>
-                        <li>VIP Support</li>
-                        <li>Premium Account</li>
-                    </ul>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Get Started</a>
-                </div>
-                <div class="plan-card">
-                    <h3>Elite</h3>
-                    <div class="price">$50</div>
-                    <ul class="features">
-                        <li>1% Weekly Returns</li>
-                        <li>Flexible Withdrawals</li>
-                        <li>24/7 Dedicated Support</li>
-                        <li>Elite Account</li>
-                    </ul>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Get Started</a>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <section id="testimonials" style="padding: 60px 0; background-color: var(--light);">
-        <div class="container">
-            <h2 class="section-title">What Our Investors Say</h2>
-            <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); gap: 30px;">
-                <div style="background: white; padding: 30px; border-radius: 10px; box-shadow: 0 5px 15px rgba(0,0,0,0.05);">
-                    <div style="display: flex; align-items: center; margin-bottom: 20px;">
-                        <div style="width: 50px; height: 50px; background-color: var(--accent); border-radius: 50%; margin-right: 15px;"></div>
-                        <div>
-                            <h4 style="margin: 0;">John D.</h4>
-                            <p style="margin: 0; opacity: 0.7;">Investor since 2022</p>
-                        </div>
-                    </div>
-                    <p>"I started with $20 and now I'm making consistent weekly returns. The platform is easy to use and payments are always on time."</p>
-                </div>
-                <div style="background: white; padding: 30px; border-radius: 10px; box-shadow: 0 5px 15px rgba(0,0,0,0.05);">
-                    <div style="display: flex; align-items: center; margin-bottom: 20px;">
-                        <div style="width: 50px; height: 50px; background-color: var(--accent); border-radius: 50%; margin-right: 15px;"></div>
-                        <div>
-                            <h4 style="margin: 0;">Sarah K.</h4>
-                            <p style="margin: 0; opacity: 0.7;">Investor since 2023</p>
-                        </div>
-                    </div>
-                    <p>"The referral program is amazing! I've earned over $100 just by inviting my friends to join the platform."</p>
-                </div>
-                <div style="background: white; padding: 30px; border-radius: 10px; box-shadow: 0 5px 15px rgba(0,0,0,0.05);">
-                    <div style="display: flex; align-items: center; margin-bottom: 20px;">
-                        <div style="width: 50px; height: 50px; background-color: var(--accent); border-radius: 50%; margin-right: 15px;"></div>
-                        <div>
-                            <h4 style="margin: 0;">Michael T.</h4>
-                            <p style="margin: 0; opacity: 0.7;">Investor since 2023</p>
-                        </div>
-                    </div>
-                    <p>"I was skeptical at first but after receiving my first payout, I increased my investment. The team is professional and responsive."</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <section id="faq" style="padding: 60px 0;">
-        <div class="container">
-            <h2 class="section-title">Frequently Asked Questions</h2>
-            <div style="max-width: 800px; margin: 0 auto;">
-                <div style="margin-bottom: 20px; border-bottom: 1px solid #eee; padding-bottom: 20px;">
-                    <h3 style="margin-bottom: 10px;">How do the weekly payouts work?</h3>
-                    <p>Every week, you'll receive 1% of your invested amount directly to your account balance. You can withdraw these earnings or reinvest them.</p>
-                </div>
-                <div style="margin-bottom: 20px; border-bottom: 1px solid #eee; padding-bottom: 20px;">
-                    <h3 style="margin-bottom: 10px;">What payment methods do you accept?</h3>
-                    <p>We accept Visa cards and MTN mobile money for deposits and withdrawals.</p>
-                </div>
-                <div style="margin-bottom: 20px; border-bottom: 1px solid #eee; padding-bottom: 20px;">
-                    <h3 style="margin-bottom: 10px;">Is there a referral program?</h3>
-                    <p>Yes! You earn 5% of your referral's first deposit. There's no limit to how much you can earn through referrals.</p>
-                </div>
-                <div style="margin-bottom: 20px; border-bottom: 1px solid #eee; padding-bottom: 20px;">
-                    <h3 style="margin-bottom: 10px;">How do I withdraw my earnings?</h3>
-                    <p>You can request a withdrawal from your dashboard. Withdrawals are processed within 24 hours to your preferred payment method.</p>
-                </div>
-                <div style="margin-bottom: 20px;">
-                    <h3 style="margin-bottom: 10px;">Is my investment secure?</h3>
-                    <p>We implement bank-level security measures including encryption and two-factor authentication to protect your funds and personal information.</p>
-                </div>
-            </div>
-        </div>
-    </section>
-
-    <section style="padding: 60px 0; background-color: var(--primary); text-align: center;">
-        <div class="container">
-            <h2 style="margin-bottom: 20px;">Ready to Start Earning?</h2>
-            <p style="max-width: 600px; margin: 0 auto 30px;">Join thousands of satisfied investors today and start growing your wealth with our simple and transparent investment platform.</p>
-            <a href="{{ url_for('register') }}" class="btn btn-primary">Sign Up Now</a>
-        </div>
-    </section>
-
-    <footer>
-        <div class="container">
-            <div class="footer-links">
-                <a href="{{ url_for('home') }}">Home</a>
-                <a href="#how-it-works">How It Works</a>
-                <a href="#plans">Plans</a>
-                <a href="#faq">FAQ</a>
-                <a href="#">Contact</a>
-                <a href="#">Terms</a>
-                <a href="#">Privacy</a>
-            </div>
-            <div class="social-links">
-                <a href="#"><i class="fab fa-facebook"></i></a>
-                <a href="#"><i class="fab fa-twitter"></i></a>
-                <a href="#"><i class="fab fa-instagram"></i></a>
-                <a href="#"><i class="fab fa-telegram"></i></a>
-            </div>
-            <div class="contact-info">
-                <p>Email: {{ support_email }} | Phone: {{ support_phone }}</p>
-            </div>
-            <p class="copyright">© {{ current_year }} {{ site_name }}. All rights reserved.</p>
-        </div>
-    </footer>
-
-    <script>
-        // Simple form validation
-        document.addEventListener('DOMContentLoaded', function() {
-            // This would be enhanced with actual form validation in a real implementation
-            console.log('Yellow Money Heist - Secure Investment Platform');
-        });
-    </script>
-</body>
-</html>
-        ''',
-        'register.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="auth-container">
-    <h2>Create Your Account</h2>
-    <form action="{{ url_for('register') }}" method="POST">
-        <div class="form-group">
-            <label for="username">Username</label>
-            <input type="text" id="username" name="username" required>
-            <small id="username-availability"></small>
-        </div>
-        <div class="form-group">
-            <label for="email">Email Address</label>
-            <input type="email" id="email" name="email" required>
-            <small id="email-availability"></small>
-        </div>
-        <div class="form-group">
-            <label for="password">Password</label>
-            <input type="password" id="password" name="password" required>
-        </div>
-        <div class="form-group">
-            <label for="phone">Phone Number</label>
-            <input type="tel" id="phone" name="phone" required>
-        </div>
-        <div class="form-group">
-            <label for="referral_code">Referral Code (optional)</label>
-            <input type="text" id="referral_code" name="referral_code">
-        </div>
-        <div class="form-group">
-            <input type="checkbox" id="terms" name="terms" required>
-            <label for="terms">I agree to the <a href="#">Terms of Service</a> and <a href="#">Privacy Policy</a></label>
-        </div>
-        <button type="submit" class="btn btn-primary">Register</button>
-    </form>
-    <p>Already have an account? <a href="{{ url_for('login') }}">Login here</a></p>
-</div>
-<script>
-    // Check username availability
-    document.getElementById('username').addEventListener('blur', function() {
-        const username = this.value;
-        if(username.length > 3) {
-            fetch(`/api/check_username?username=${username}`)
-                .then(response => response.json())
-                .then(data => {
-                    const availability = document.getElementById('username-availability');
-                    if(data.exists) {
-                        availability.textContent = 'Username already taken';
-                        availability.style.color = 'red';
-                    } else {
-                        availability.textContent = 'Username available';
-                        availability.style.color = 'green';
-                    }
-                });
-        }
-    });
-
-    // Check email availability
-    document.getElementById('email').addEventListener('blur', function() {
-        const email = this.value;
-        if(email.includes('@')) {
-            fetch(`/api/check_email?email=${email}`)
-                .then(response => response.json())
-                .then(data => {
-                    const availability = document.getElementById('email-availability');
-                    if(data.exists) {
-                        availability.textContent = 'Email already registered';
-                        availability.style.color = 'red';
-                    } else {
-                        availability.textContent = 'Email available';
-                        availability.style.color = 'green';
-                    }
-                });
-        }
-    });
-</script>
-{% endblock %}
-        ''',
-        'login.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="auth-container">
-    <h2>Login to Your Account</h2>
-    {% with messages = get_flashed_messages(with_categories=true) %}
-        {% if messages %}
-            {% for category, message in messages %}
-                <div class="alert alert-{{ category }}">{{ message }}</div>
-            {% endfor %}
-        {% endif %}
-    {% endwith %}
-    <form action="{{ url_for('login') }}" method="POST">
-        <div class="form-group">
-            <label for="username">Username or Email</label>
-            <input type="text" id="username" name="username" required>
-        </div>
-        <div class="form-group">
-            <label for="password">Password</label>
-            <input type="password" id="password" name="password" required>
-        </div>
-        <div class="form-group">
-            <input type="checkbox" id="remember" name="remember">
-            <label for="remember">Remember me</label>
-            <a href="#" style="float: right;">Forgot password?</a>
-        </div>
-        <button type="submit" class="btn btn-primary">Login</button>
-    </form>
-    <p>Don't have an account? <a href="{{ url_for('register') }}">Register here</a></p>
-</div>
-{% endblock %}
-        ''',
-        'dashboard.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="dashboard-container">
-    <div class="welcome-banner">
-        <h2>Welcome back, {{ user.username }}!</h2>
-        <p>Your investment journey continues. Check your stats below.</p>
-    </div>
-
-    <div class="stats-grid">
-        <div class="stat-card">
-            <h3>Total Invested</h3>
-            <p>${{ "%.2f"|format(total_invested) }}</p>
-        </div>
-        <div class="stat-card">
-            <h3>Active Investments</h3>
-            <p>{{ investments|length }}</p>
-        </div>
-        <div class="stat-card">
-            <h3>Referrals</h3>
-            <p>{{ referral_count }}</p>
-        </div>
-        <div class="stat-card">
-            <h3>Account Status</h3>
-            <p>{{ "Verified" if user.verified else "Pending Verification" }}</p>
-        </div>
-    </div>
-
-    <div class="dashboard-sections">
-        <div class="investments-section">
-            <h3>Your Active Investments</h3>
-            {% if investments %}
-                <div class="investments-list">
-                    {% for inv in investments %}
-                    <div class="investment-item">
-                        <div>
-                            <h4>${{ "%.2f"|format(inv.amount) }} Plan</h4>
-                            <p>Started on {{ inv.start_date.strftime('%Y-%m-%d') }}</p>
-                        </div>
-                        <div>
-                            <p>Next payout: {% if inv.last_payout %}{{ (inv.last_payout + timedelta(days=7)).strftime('%Y-%m-%d') }}{% else %}{{ (inv.start_date + timedelta(days=7)).strftime('%Y-%m-%d') }}{% endif %}</p>
-                        </div>
-                    </div>
-                    {% endfor %}
-                </div>
-            {% else %}
-                <p>You don't have any active investments yet.</p>
-                <a href="{{ url_for('invest') }}" class="btn btn-primary">Start Investing</a>
-            {% endif %}
-        </div>
-
-        <div class="transactions-section">
-            <h3>Recent Transactions</h3>
-            {% if transactions %}
-                <div class="transactions-list">
-                    {% for trans in transactions %}
-                    <div class="transaction-item">
-                        <div>
-                            <h4>{{ trans.type|title }}</h4>
-                            <p>{{ trans.created_at.strftime('%Y-%m-%d %H:%M') }}</p>
-                        </div>
-                        <div class="amount {{ trans.type }}">
-                            ${{ "%.2f"|format(trans.amount) }}
-                        </div>
-                    </div>
-                    {% endfor %}
-                </div>
-                <a href="#" class="view-all">View All Transactions</a>
-            {% else %}
-                <p>No transactions yet.</p>
-            {% endif %}
-        </div>
-    </div>
-
-    <div class="quick-actions">
-        <a href="{{ url_for('invest') }}" class="btn btn-primary">Make Investment</a>
-        <a href="{{ url_for('withdraw') }}" class="btn btn-outline">Withdraw Funds</a>
-        <a href="{{ url_for('referrals') }}" class="btn btn-outline">Referral Program</a>
-    </div>
-</div>
-{% endblock %}
-        ''',
-        'invest.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="invest-container">
-    <h2>Choose Your Investment Plan</h2>
-    <p>Select from our range of investment plans and start earning 1% weekly returns.</p>
-
-    <div class="investment-plans">
-        <div class="plan-card">
-            <h3>Starter Plan</h3>
-            <div class="price">$5</div>
-            <ul class="features">
-                <li>1% Weekly Returns ($0.05/week)</li>
-                <li>Flexible Withdrawal</li>
-                <li>Basic Support</li>
-            </ul>
-            <form action="{{ url_for('invest') }}" method="POST">
-                <input type="hidden" name="plan" value="5">
-                <input type="hidden" name="amount" value="5">
-                <button type="submit" class="btn btn-primary">Invest Now</button>
-            </form>
-        </div>
-
-        <div class="plan-card recommended">
-            <div class="recommended-badge">Popular</div>
-            <h3>Basic Plan</h3>
-            <div class="price">$10</div>
-            <ul class="features">
-                <li>1% Weekly Returns ($0.10/week)</li>
-                <li>Flexible Withdrawal</li>
-                <li>Priority Support</li>
-            </ul>
-            <form action="{{ url_for('invest') }}" method="POST">
-                <input type="hidden" name="plan" value="10">
-                <input type="hidden" name="amount" value="10">
-                <button type="submit" class="btn btn-primary">Invest Now</button>
-            </form>
-        </div>
-
-        <div class="plan-card">
-            <h3>Premium Plan</h3>
-            <div class="price">$20</div>
-            <ul class="features">
-                <li>1% Weekly Returns ($0.20/week)</li>
-                <li>Flexible Withdrawal</li>
-                <li>VIP Support</li>
-            </ul>
-            <form action="{{ url_for('invest') }}" method="POST">
-                <input type="hidden" name="plan" value="20">
-                <input type="hidden" name="amount" value="20">
-                <button type="submit" class="btn btn-primary">Invest Now</button>
-            </form>
-        </div>
-
-        <div class="plan-card">
-            <h3>Elite Plan</h3>
-            <div class="price">$50</div>
-            <ul class="features">
-                <li>1% Weekly Returns ($0.50/week)</li>
-                <li>Flexible Withdrawal</li>
-                <li>Dedicated Support</li>
-            </ul>
-            <form action="{{ url_for('invest') }}" method="POST">
-                <input type="hidden" name="plan" value="50">
-                <input type="hidden" name="amount" value="50">
-                <button type="submit" class="btn btn-primary">Invest Now</button>
-            </form>
-        </div>
-    </div>
-
-    <div class="investment-info">
-        <h3>How It Works</h3>
-        <ol>
-            <li>Choose your investment plan</li>
-            <li>Complete payment via Visa or MTN Mobile Money</li>
-            <li>Start receiving 1% of your investment every week</li>
-            <li>Withdraw your earnings anytime or reinvest</li>
-        </ol>
-    </div>
-</div>
-{% endblock %}
-        ''',
-        'payment.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="payment-container">
-    <h2>Complete Your Investment</h2>
-    <div class="payment-summary">
-        <h3>Investment Summary</h3>
-        <p>Amount: ${{ "%.2f"|format(transaction.amount) }}</p>
-        <p>Reference: {{ transaction.reference }}</p>
-    </div>
-
-    <form action="{{ url_for('payment', transaction_id=transaction.id) }}" method="POST">
-        <div class="payment-methods">
-            <div class="payment-method">
-                <input type="radio" id="visa" name="payment_method" value="visa" checked>
-                <label for="visa">
-                    <img src="https://via.placeholder.com/100x60?text=VISA" alt="Visa">
-                    <span>Pay with Visa Card</span>
-                </label>
-            </div>
-            <div class="payment-method">
-                <input type="radio" id="mtn" name="payment_method" value="mtn">
-                <label for="mtn">
-                    <img src="https://via.placeholder.com/100x60?text=MTN" alt="MTN">
-                    <span>Pay with MTN Mobile Money</span>
-                </label>
-            </div>
-        </div>
-
-        <div id="visa-details" class="payment-details">
-            <div class="form-group">
-                <label for="card-number">Card Number</label>
-                <input type="text" id="card-number" placeholder="1234 5678 9012 3456">
-            </div>
-            <div class="form-group">
-                <label for="card-name">Cardholder Name</label>
-                <input type="text" id="card-name" placeholder="John Doe">
-            </div>
-            <div class="form-row">
-                <div class="form-group">
-                    <label for="expiry">Expiry Date</label>
-                    <input type="text" id="expiry" placeholder="MM/YY">
-                </div>
-                <div class="form-group">
-                    <label for="cvv">CVV</label>
-                    <input type="text" id="cvv" placeholder="123">
-                </div>
-            </div>
-        </div>
-
-        <div id="mtn-details" class="payment-details" style="display: none;">
-            <div class="form-group">
-                <p>Send {{ "%.2f"|format(transaction.amount) }} UGX to MTN Mobile Money number:</p>
-                <p class="mtn-number">{{ mtn_account }}</p>
-                <p>Use your reference: <strong>{{ transaction.reference }}</strong></p>
-            </div>
-            <div class="form-group">
-                <label for="mtn-phone">Your MTN Number</label>
-                <input type="tel" id="mtn-phone" name="mtn_phone" placeholder="07XXXXXXXX">
-            </div>
-        </div>
-
-        <button type="submit" class="btn btn-primary">Complete Payment</button>
-    </form>
-</div>
-
-<script>
-    // Show/hide payment details based on selection
-    document.querySelectorAll('input[name="payment_method"]').forEach(radio => {
-        radio.addEventListener('change', function() {
-            document.getElementById('visa-details').style.display = 
-                this.value === 'visa' ? 'block' : 'none';
-            document.getElementById('mtn-details').style.display = 
-                this.value === 'mtn' ? 'block' : 'none';
-        });
-    });
-</script>
-{% endblock %}
-        ''',
-        'withdraw.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="withdraw-container">
-    <h2>Withdraw Funds</h2>
-    <div class="balance-info">
-        <p>Available Balance: <strong>${{ "%.2f"|format(available_balance) }}</strong></p>
-    </div>
-
-    <form action="{{ url_for('withdraw') }}" method="POST">
-        <div class="form-group">
-            <label for="amount">Amount to Withdraw</label>
-            <input type="number" id="amount" name="amount" min="5" max="{{ available_balance }}" step="0.01" required>
-            <small>Minimum withdrawal: $5.00</small>
-        </div>
-
-        <div class="form-group">
-            <label>Withdrawal Method</label>
-            <div class="payment-methods">
-                <div class="payment-method">
-                    <input type="radio" id="withdraw-visa" name="method" value="visa" checked>
-                    <label for="withdraw-visa">
-                        <img src="https://via.placeholder.com/100x60?text=VISA" alt="Visa">
-                        <span>Visa Card</span>
-                    </label>
-                </div>
-                <div class="payment-method">
-                    <input type="radio" id="withdraw-mtn" name="method" value="mtn">
-                    <label for="withdraw-mtn">
-                        <img src="https://via.placeholder.com/100x60?text=MTN" alt="MTN">
-                        <span>MTN Mobile Money</span>
-                    </label>
-                </div>
-            </div>
-        </div>
-
-        <div id="withdraw-visa-details" class="payment-details">
-            <div class="form-group">
-                <label for="card-number">Card Number</label>
-                <input type="text" id="card-number" placeholder="1234 5678 9012 3456">
-            </div>
-        </div>
-
-        <div id="withdraw-mtn-details" class="payment-details" style="display: none;">
-            <div class="form-group">
-                <label for="mtn-phone">MTN Mobile Money Number</label>
-                <input type="tel" id="mtn-phone" name="mtn_phone" placeholder="07XXXXXXXX">
-            </div>
-        </div>
-
-        <button type="submit" class="btn btn-primary">Request Withdrawal</button>
-    </form>
-
-    <div class="withdrawal-info">
-        <h3>Withdrawal Information</h3>
-        <ul>
-            <li>Withdrawals are processed within 24 hours</li>
-            <li>Minimum withdrawal amount is $5.00</li>
-            <li>No withdrawal fees</li>
-        </ul>
-    </div>
-</div>
-
-<script>
-    // Show/hide withdrawal details based on selection
-    document.querySelectorAll('input[name="method"]').forEach(radio => {
-        radio.addEventListener('change', function() {
-            document.getElementById('withdraw-visa-details').style.display = 
-                this.value === 'visa' ? 'block' : 'none';
-            document.getElementById('withdraw-mtn-details').style.display = 
-                this.value === 'mtn' ? 'block' : 'none';
-        });
-    });
-</script>
-{% endblock %}
-        ''',
-        'kyc.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="kyc-container">
-    <h2>Complete KYC Verification</h2>
-    <p>To comply with financial regulations and ensure the security of all transactions, we require you to complete KYC (Know Your Customer) verification.</p>
-
-    <form action="{{ url_for('kyc') }}" method="POST" enctype="multipart/form-data">
-        <div class="form-group">
-            <label for="full-name">Full Name (as on ID)</label>
-            <input type="text" id="full-name" name="full_name" required>
-        </div>
-
-        <div class="form-group">
-            <label for="id-type">ID Type</label>
-            <select id="id-type" name="id_type" required>
-                <option value="">Select ID Type</option>
-                <option value="passport">Passport</option>
-                <option value="national_id">National ID</option>
-                <option value="driving_license">Driving License</option>
-            </select>
-        </div>
-
-        <div class="form-group">
-            <label for="id-number">ID Number</label>
-            <input type="text" id="id-number" name="id_number" required>
-        </div>
-
-        <div class="form-group">
-            <label for="id-front">ID Front Photo</label>
-            <input type="file" id="id-front" name="id_front" accept="image/*" required>
-            <small>Clear photo of the front side of your ID</small>
-        </div>
-
-        <div class="form-group">
-            <label for="id-back">ID Back Photo</label>
-            <input type="file" id="id-back" name="id_back" accept="image/*">
-            <small>Clear photo of the back side of your ID (if applicable)</small>
-        </div>
-
-        <div class="form-group">
-            <label for="selfie">Selfie with ID</label>
-            <input type="file" id="selfie" name="selfie" accept="image/*" required>
-            <small>Clear selfie holding your ID next to your face</small>
-        </div>
-
-        <div class="form-group">
-            <input type="checkbox" id="kyc-consent" name="kyc_consent" required>
-            <label for="kyc-consent">I consent to the processing of my personal data for verification purposes</label>
-        </div>
-
-        <button type="submit" class="btn btn-primary">Submit for Verification</button>
-    </form>
-
-    <div class="kyc-info">
-        <h3>Why KYC is Required</h3>
-        <ul>
-            <li>Prevents fraud and money laundering</li>
-            <li>Protects your account from unauthorized access</li>
-            <li>Required by financial regulations</li>
-            <li>Enables higher withdrawal limits</li>
-        </ul>
-        <p>Your documents are securely stored and encrypted. We do not share your information with third parties.</p>
-    </div>
-</div>
-{% endblock %}
-        ''',
-        'referrals.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="referrals-container">
-    <h2>Your Referral Program</h2>
-    
-    <div class="referral-stats">
-        <div class="stat-card">
-            <h3>Your Referral Code</h3>
-            <div class="referral-code">{{ user.referral_code }}</div>
-            <button onclick="copyReferralCode()" class="btn btn-outline">Copy Code</button>
-        </div>
-        <div class="stat-card">
-            <h3>Total Referrals</h3>
-            <p>{{ referred_users|length }}</p>
-        </div>
-        <div class="stat-card">
-            <h3>Total Earned</h3>
-            <p>${{ "%.2f"|format(total_earned) }}</p>
-        </div>
-    </div>
-
-    <div class="referral-share">
-        <h3>Share Your Referral Link</h3>
-        <div class="share-link">
-            <input type="text" id="referral-link" value="{{ request.host_url }}register?ref={{ user.referral_code }}" readonly>
-            <button onclick="copyReferralLink()" class="btn btn-primary">Copy Link</button>
-        </div>
-        <div class="share-buttons">
-            <button class="btn btn-outline"><i class="fab fa-facebook"></i> Share on Facebook</button>
-            <button class="btn btn-outline"><i class="fab fa-whatsapp"></i> Share on WhatsApp</button>
-            <button class="btn btn-outline"><i class="fab fa-telegram"></i> Share on Telegram</button>
-        </div>
-    </div>
-
-    <div class="referral-details">
-        <h3>How It Works</h3>
-        <ol>
-            <li>Share your referral link with friends</li>
-            <li>They sign up using your link</li>
-            <li>They make their first deposit</li>
-            <li>You earn 5% of their first deposit</li>
-            <li>No limit on how much you can earn!</li>
-        </ol>
-    </div>
-
-    {% if referred_users %}
-    <div class="referral-list">
-        <h3>Your Referrals</h3>
-        <table>
-            <thead>
-                <tr>
-                    <th>Username</th>
-                    <th>Join Date</th>
-                    <th>Status</th>
-                </tr>
-            </thead>
-            <tbody>
-                {% for ref in referred_users %}
-                <tr>
-                    <td>{{ ref.username }}</td>
-                    <td>{{ ref.created_at.strftime('%Y-%m-%d') }}</td>
-                    <td>{{ "Active" if ref.verified else "Pending" }}</td>
-                </tr>
-                {% endfor %}
-            </tbody>
-        </table>
-    </div>
-    {% endif %}
-
-    {% if referral_earnings %}
-    <div class="earnings-list">
-        <h3>Your Referral Earnings</h3>
-        <table>
-            <thead>
-                <tr>
-                    <th>Date</th>
-                    <th>Amount</th>
-                    <th>From</th>
-                </tr>
-            </thead>
-            <tbody>
-                {% for earning in referral_earnings %}
-                <tr>
-                    <td>{{ earning.created_at.strftime('%Y-%m-%d') }}</td>
-                    <td>${{ "%.2f"|format(earning.amount) }}</td>
-                    <td>{{ earning.reference }}</td>
-                </tr>
-                {% endfor %}
-            </tbody>
-        </table>
-    </div>
-    {% endif %}
-</div>
-
-<script>
-    function copyReferralCode() {
-        navigator.clipboard.writeText("{{ user.referral_code }}");
-        alert("Referral code copied to clipboard!");
-    }
+# Brand icons (Font Awesome Free, CC BY 4.0) are inlined as SVG instead of loading the icon font
+def load_icon(name):
+    with open(os.path.join(app.static_folder, 'icons', f'{name}.svg')) as f:
+        svg = re.sub(r'<!--.*?-->', '', f.read())
+    return Markup(svg.replace('<svg ', '<svg class="icon" width="1em" height="1em" fill="currentColor" aria-hidden="true" ', 1))
+
+app.jinja_env.globals['icons'] = {
+    name: load_icon(name) for name in ('facebook', 'twitter', 'instagram', 'telegram', 'whatsapp')
+}
+
+# Announce the shared stylesheet in a Link header so an HTTP/2 proxy or CDN can push it
+# (or send 103 Early Hints) before the browser has parsed the HTML
+@app.after_request
+def add_preload_links(response):
+    if response.status_code == 200 and response.mimetype == 'text/html':
+        stylesheet = 'css/home.css' if request.endpoint == 'home' else 'css/app.css'
+        response.headers['Link'] = f"<{url_for('static', filename=stylesheet)}>; rel=preload; as=style"
+    return response
+
+@app.template_filter('money')
+def format_money(amount):
+    return f'${amount:,.2f}'
+
+# The year only changes at midnight, so the context dict is built once per day
+@lru_cache(maxsize=1)
+def year_context(day):
+    return {'current_year': date.fromordinal(day).year}
 
-    function copyReferralLink() {
-        const link = document.getElementById('referral-link');
-        link.select();
-        navigator.clipboard.writeText(link.value);
-        alert("Referral link copied to clipboard!");
-    }
-</script>
-{% endblock %}
-        ''',
-        '404.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="error-container">
-    <h1>404 - Page Not Found</h1>
-    <p>The page you're looking for doesn't exist or has been moved.</p>
-    <a href="{{ url_for('home') }}" class="btn btn-primary">Return Home</a>
-</div>
-{% endblock %}
-        ''',
-        '500.html': '''
-{% extends "layout.html" %}
-{% block content %}
-<div class="error-container">
-    <h1>500 - Server Error</h1>
-    <p>Something went wrong on our end. Please try again later.</p>
-    <a href="{{ url_for('home') }}" class="btn btn-primary">Return Home</a>
-</div>
-{% endblock %}
-        ''',
-        'layout.html': '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{% block title %}{{ site_name }}{% endblock %}</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css">
-    <style>
-        :root {
-            --primary: #FFD700;
-            --secondary: #000;
-            --accent: #FFA500;
-            --light: #FFF8DC;
-            --dark: #333;
-            --success: #28a745;
-            --danger: #dc3545;
-            --info: #17a2b8;
-        }
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }
-        body {
-            background-color: #f5f5f5;
-            color: var(--dark);
-            line-height: 1.6;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }
-        header {
-            background-color: var(--primary);
-            color: var(--secondary);
-            padding: 15px 0;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        nav {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        .logo {
-            font-size: 24px;
-            font-weight: bold;
-            color: var(--secondary);
-            text-decoration: none;
-        }
-        .nav-links {
-            display: flex;
-            gap: 20px;
-        }
-        .nav-links a {
-            color: var(--secondary);
-            text-decoration: none;
-            font-weight: 500;
-        }
-        .nav-links a:hover {
-            color: var(--accent);
-        }
-        .user-menu {
-            display: flex;
-            align-items: center;
-            gap: 15px;
-        }
-        .user-menu .username {
-            font-weight: 500;
-        }
-        .btn {
-            padding: 8px 16px;
-            border-radius: 5px;
-            text-decoration: none;
-            font-weight: 500;
-            transition: all 0.3s ease;
-            display: inline-block;
-            border: none;
-            cursor: pointer;
-        }
-        .btn-primary {
-            background-color: var(--secondary);
-            color: white;
-        }
-        .btn-outline {
-            border: 1px solid var(--secondary);
-            color: var(--secondary);
-            background: none;
-        }
-        .btn-success {
-            background-color: var(--success);
-            color: white;
-        }
-        .btn-danger {
-            background-color: var(--danger);
-            color: white;
-        }
-        .btn-info {
-            background-color: var(--info);
-            color: white;
-        }
-        .btn:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-            opacity: 0.9;
-        }
-        main {
-            min-height: calc(100vh - 150px);
-            padding: 30px 0;
-        }
-        footer {
-            background-color: var(--secondary);
-            color: white;
-            padding: 30px 0;
-            text-align: center;
-        }
-        .footer-links {
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 20px;
-        }
-        .footer-links a {
-            color: white;
-            text-decoration: none;
-        }
-        .footer-links a:hover {
-            color: var(--primary);
-        }
-        .copyright {
-            font-size: 14px;
-            opacity: 0.8;
-        }
-        .alert {
-            padding: 10px 15px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-        }
-        .alert-success {
-            background-color: #d4edda;
-            color: #155724;
-        }
-        .alert-error {
-            background-color: #f8d7da;
-            color: #721c24;
-        }
-        .alert-info {
-            background-color: #d1ecf1;
-            color: #0c5460;
-        }
-        .auth-container {
-            max-width: 500px;
-            margin: 0 auto;
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-        }
-        .auth-container h2 {
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        .form-group {
-            margin-bottom: 20px;
-        }
-        .form-group label {
-            display: block;
-            margin-bottom: 5px;
-            font-weight: 500;
-        }
-        .form-group input, 
-        .form-group select, 
-        .form-group textarea {
-            width: 100%;
-            padding: 10px;
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            font-size: 16px;
-        }
-        .form-group input[type="checkbox"] {
-            width: auto;
-            margin-right: 10px;
-        }
-        .form-row {
-            display: flex;
-            gap: 15px;
-        }
-        .form-row .form-group {
-            flex: 1;
-        }
-        .dashboard-container {
-            max-width: 1200px;
-            margin: 0 auto;
-        }
-        .welcome-banner {
-            background: linear-gradient(rgba(255, 215, 0, 0.1), rgba(255, 215, 0, 0.1)), url('https://via.placeholder.com/1200x200') no-repeat center center/cover;
-            padding: 40px;
-            border-radius: 10px;
-            margin-bottom: 30px;
-            color: var(--dark);
-        }
-        .welcome-banner h2 {
-            margin-bottom: 10px;
-        }
-        .stats-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 20px;
-            margin-bottom: 30px;
-        }
-        .stat-card {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-            text-align: center;
-        }
-        .stat-card h3 {
-            font-size: 16px;
-            margin-bottom: 10px;
-            color: var(--dark);
-        }
-        .stat-card p {
-            font-size: 24px;
-            font-weight: bold;
-            color: var(--accent);
-        }
-        .dashboard-sections {
-            display: grid;
-            grid-template-columns: 1fr;
-            gap: 30px;
-        }
-        @media (min-width: 992px) {
-            .dashboard-sections {
-                grid-template-columns: 1fr 1fr;
-            }
-        }
-        .investments-section, .transactions-section {
-            background: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-        }
-        .investments-section h3, .transactions-section h3 {
-            margin-bottom: 20px;
-            padding-bottom: 10px;
-            border-bottom: 1px solid #eee;
-        }
-        .investments-list, .transactions-list {
-            display: grid;
-            gap: 15px;
-        }
-        .investment-item, .transaction-item {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 15px;
-            background: var(--light);
-            border-radius: 5px;
-        }
-        .transaction-item .amount {
-            font-weight: bold;
-        }
-        .transaction-item .deposit {
-            color: var(--success);
-        }
-        .transaction-item .withdrawal {
-            color: var(--danger);
-        }
-        .transaction-item .payout {
-            color: var(--accent);
-        }
-        .transaction-item .referral {
-            color: var(--info);
-        }
-        .view-all {
-            display: block;
-            text-align: right;
-            margin-top: 15px;
-            color: var(--accent);
-            text-decoration: none;
-        }
-        .quick-actions {
-            display: flex;
-            justify-content: center;
-            gap: 15px;
-            margin-top: 30px;
-        }
-        .invest-container, .withdraw-container, .kyc-container, .referrals-container {
-            max-width: 800px;
-            margin: 0 auto;
-            background: white;
-            padding: 30px;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-        }
-        .investment-plans {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 30px;
-            margin: 40px 0;
-        }
-        .plan-card {
-            background: var(--light);
-            padding: 25px;
-            border-radius: 10px;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-            position: relative;
-            transition: all 0.3s ease;
-        }
-        .plan-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-        }
-        .plan-card.recommended {
-            border: 2px solid var(--accent);
-        }
-        .recommended-badge {
-            position: absolute;
-            top: -10px;
-            right: 20px;
-            background: var(--accent);
-            color: white;
-            padding: 5px 10px;
-            border-radius: 20px;
-            font-size: 12px;
-            font-weight: bold;
-        }
-        .plan-card h3 {
-            margin-bottom: 15px;
-            text-align: center;
-        }
-        .plan-card .price {
-            font-size: 28px;
-            font-weight: bold;
-            text-align: center;
-            color: var(--accent);
-            margin-bottom: 20px;
-        }
-        .plan-card .features {
-            margin-bottom: 25px;
-        }
-        .plan-card .features li {
-            margin-bottom: 10px;
-            list-style-type: none;
-            padding-left: 25px;
-            position: relative;
-        }
-        .plan-card .features li:before {
-            content: '✓';
-            position: absolute;
-            left: 0;
-            color: var(--accent);
-            font-weight: bold;
-        }
-        .plan-card button {
-            width: 100%;
-        }
-        .investment-info {
-            margin-top: 40px;
-        }
-        .investment-info ol {
-            padding-left: 20px;
-            margin-top: 15px;
-        }
-        .investment-info li {
-            margin-bottom: 10px;
-        }
-        .payment-methods {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin: 20px 0;
-        }
-        .payment-method {
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            padding: 15px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-        .payment-method:hover {
-            border-color: var(--accent);
-        }
-        .payment-method input[type="radio"] {
-            display: none;
-        }
-        .payment-method input[type="radio"]:checked + label {
-            color: var(--accent);
-        }
-        .payment-method label {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 10px;
-            cursor: pointer;
-        }
-        .payment-method img {
-            height: 40px;
-        }
-        .payment-details {
-            margin: 20px 0;
-            padding: 20px;
-            background: var(--light);
-            border-radius: 5px;
-        }
-        .balance-info {
-            background: var(--light);
-            padding: 15px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-            text-align: center;
-        }
-        .balance-info p {
-            font-size: 18px;
-        }
-        .withdrawal-info {
-            margin-top: 30px;
-            padding: 20px;
-            background: var(--light);
-            border-radius: 5px;
-        }
-        .withdrawal-info ul {
-            padding-left: 20px;
-            margin-top: 10px;
-        }
-        .withdrawal-info li {
-            margin-bottom: 5px;
-        }
-        .referral-stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 20px;
-            margin: 30px 0;
-        }
-        .referral-code {
-            font-size: 24px;
-            font-weight: bold;
-            letter-spacing: 2px;
-            color: var(--accent);
-            margin: 15px 0;
-            padding: 10px;
-            background: var(--light);
-            border-radius: 5px;
-            text-align: center;
-        }
-        .share-link {
-            display: flex;
-            gap: 10px;
-            margin: 20px 0;
-        }
-        .share-link input {
-            flex: 1;
-            padding: 10px;
-            border: 1px solid #ddd;
-            border-radius: 5px;
-        }
-        .share-buttons {
-            display: flex;
-            gap: 10px;
-            margin-bottom: 30px;
-            flex-wrap: wrap;
-        }
-        .share-buttons button {
-            flex: 1;
-            min-width: 150px;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-        }
-        table th, table td {
-            padding: 12px 15px;
-            text-align: left;
-            border-bottom: 1px solid #ddd;
-        }
-        table th {
-            background: var(--light);
-            font-weight: 500;
-        }
-        table tr:hover {
-            background: rgba(255, 215, 0, 0.1);
-        }
-        .error-container {
-            max-width: 600px;
-            margin: 50px auto;
-            text-align: center;
-        }
-        .error-container h1 {
-            font-size: 48px;
-            margin-bottom: 20px;
-            color: var(--danger);
-        }
-        .error-container p {
-            font-size: 20px;
-            margin-bottom: 30px;
-        }
-        @media (max-width: 768px) {
-            .nav-links {
-                display: none;
-            }
-            .quick-actions {
-                flex-direction: column;
-            }
-            .share-buttons button {
-                min-width: 100%;
-            }
-        }
-    </style>
-</head>
-<body>
-    <header>
-        <div class="container">
-            <nav>
-                <a href="{{ url_for('home') }}" class="logo">{{ site_name }}</a>
-                {% if 'user_id' in session %}
-                <div class="nav-links">
-                    <a href="{{ url_for('dashboard') }}">Dashboard</a>
-                    <a href="{{ url_for('invest') }}">Invest</a>
-                    <a href="{{ url_for('withdraw') }}">Withdraw</a>
-                    <a href="{{ url_for('referrals') }}">Referrals</a>
-                </div>
-                <div class="user-menu">
-                    <span class="username">{{ session['username'] }}</span>
-                    <a href="{{ url_for('logout') }}" class="btn btn-outline">Logout</a>
-                </div>
-                {% else %}
-                <div class="nav-links">
-                    <a href="#how-it-works">How It Works</a>
-                    <a href="#plans">Plans</a>
-                    <a href="#faq">FAQ</a>
-                </div>
-                <div class="auth-buttons">
-                    <a href="{{ url_for('login') }}" class="btn btn-outline">Login</a>
-                    <a href="{{ url_for('register') }}" class="btn btn-primary">Register</a>
-                </div>
-                {% endif %}
-            </nav>
-        </div>
-    </header>
-
-    <main>
-        <div class="container">
-            {% with messages = get_flashed_messages(with_categories=true) %}
-                {% if messages %}
-                    {% for category, message in messages %}
-                        <div class="alert alert-{{ category }}">{{ message }}</div>
-                    {% endfor %}
-                {% endif %}
-            {% endwith %}
-            
-            {% block content %}{% endblock %}
-        </div>
-    </main>
-
-    <footer>
-        <div class="container">
-            <div class="footer-links">
-                <a href="{{ url_for('home') }}">Home</a>
-                <a href="#how-it-works">How It Works</a>
-                <a href="#plans">Plans</a>
-                <a href="#faq">FAQ</a>
-                <a href="#">Contact</a>
-                <a href="#">Terms</a>
-                <a href="#">Privacy</a>
-            </div>
-            <div class="social-links">
-                <a href="#"><i class="fab fa-facebook"></i></a>
-                <a href="#"><i class="fab fa-twitter"></i></a>
-                <a href="#"><i class="fab fa-instagram"></i></a>
-                <a href="#"><i class="fab fa-telegram"></i></a>
-            </div>
-            <div class="contact-info">
-                <p>Email: {{ support_email }} | Phone: {{ support_phone }}</p>
-            </div>
-            <p class="copyright">© {{ current_year }} {{ site_name }}. All rights reserved.</p>
-        </div>
-    </footer>
-
-    <script>
-        // Mobile menu toggle would be added in a real implementation
-        document.addEventListener('DOMContentLoaded', function() {
-            console.log('Yellow Money Heist - Secure Investment Platform');
-            
-            // This would include more JavaScript functionality in a real implementation
-            // Such as form validation, AJAX requests, etc.
-        });
-    </script>
-</body>
-</html>
-        '''
-    }
-    
-    return templates.get(template_name, '').format(**context)
+@app.context_processor
+def inject_globals():
+    return year_context(date.today().toordinal())
+
+# create_all() only adds missing tables; columns added to existing ones are migrated here
+def migrate_schema():
+    columns = {column['name'] for column in inspect(db.engine).get_columns('user')}
+    with db.engine.begin() as conn:
+        if 'referred_by_id' not in columns:
+            conn.execute(text('ALTER TABLE "user" ADD COLUMN referred_by_id INTEGER REFERENCES "user" (id)'))
+            conn.execute(text(
+                'UPDATE "user" SET referred_by_id = '
+                '(SELECT referrer.id FROM "user" AS referrer WHERE referrer.referral_code = "user".referred_by) '
+                'WHERE referred_by IS NOT NULL'
+            ))
+        
+        # Counters start from the totals they summarise
+        counter_totals = {
+            'balance_cache': select(func.sum(Payout.amount))
+                .join(Investment, Investment.id == Payout.investment_id)
+                .where(Investment.user_id == User.id),
+            'referral_earnings_cache': select(func.sum(Transaction.amount))
+                .where(Transaction.user_id == User.id, Transaction.type == 'referral', Transaction.status == 'completed'),
+            'total_invested_cache': select(func.sum(Investment.amount))
+                .where(Investment.user_id == User.id, Investment.active == True)
+        }
+        for column, total in counter_totals.items():
+            if column not in columns:
+                conn.execute(text(f'ALTER TABLE "user" ADD COLUMN {column} FLOAT NOT NULL DEFAULT 0'))
+                conn.execute(update(User).values({column: func.coalesce(total.scalar_subquery(), 0)}))
+        
+        # Indexes declared on the models after their tables were first created
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 # Initialize Database
 with app.app_context():
     db.create_all()
+    migrate_schema()
+
+# Compile every template up front instead of on each worker's first request
+for template_name in app.jinja_env.list_templates():
+    app.jinja_env.get_template(template_name)
 
 if __name__ == '__main__':
-    # Schedule weekly payouts (in a real app, this would be a proper scheduler like Celery)
-    from threading import Thread
-    from time import sleep
-    
-    def payout_scheduler():
-        while True:
-            process_weekly_payouts()
-            sleep(86400)  # Check daily
-    
-    scheduler_thread = Thread(target=payout_scheduler)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
-    
+    # The development server is plain HTTP and picks up template edits
+    app.config['SESSION_COOKIE_SECURE'] = False
+    app.config['TEMPLATES_AUTO_RELOAD'] = True
+    app.jinja_env.auto_reload = True
+    # Only the reloader's child serves requests, so only it runs the scheduler
+    if not REDIS_URL and not scheduler.running and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start()
     app.run(debug=True)
@@ -0,0 +1,28 @@
+# gunicorn.conf.py - Yellow Money Heist production server settings
+import multiprocessing
+import os
+
+# Threaded workers let IO-bound requests (WAL reads, availability checks) overlap
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Reuse connections for the page's follow-up asset requests instead of reconnecting
+keepalive = 15
+
+# Import the app (and compile its templates) once in the master; workers share it copy-on-write
+preload_app = True
+
+def post_fork(server, worker):
+    # Connections opened during import belong to the master; each worker opens its own
+    from app import app, db, read_engine
+    with app.app_context():
+        db.engine.dispose(close=False)
+    read_engine.dispose(close=False)
+
+def when_ready(server):
+    # Run the payout scheduler once, in the master; forked workers don't inherit its thread
+    import app
+    scheduler = getattr(app, 'scheduler', None)
+    if scheduler is not None and not scheduler.running:
+        scheduler.start()
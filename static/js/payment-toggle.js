@@ -0,0 +1,10 @@
+// Show/hide the card or MTN details for the selected payment or withdrawal method
+document.addEventListener('change', function(e) {
+    var name = e.target.name;
+    if (name !== 'payment_method' && name !== 'method') return;
+    var prefix = name === 'method' ? 'withdraw-' : '';
+    document.getElementById(prefix + 'visa-details').style.display =
+        e.target.value === 'visa' ? 'block' : 'none';
+    document.getElementById(prefix + 'mtn-details').style.display =
+        e.target.value === 'mtn' ? 'block' : 'none';
+});
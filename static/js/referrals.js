@@ -0,0 +1,11 @@
+document.getElementById('copy-referral-code').addEventListener('click', function() {
+    navigator.clipboard.writeText(document.querySelector('.referral-code').textContent);
+    alert("Referral code copied to clipboard!");
+});
+
+document.getElementById('copy-referral-link').addEventListener('click', function() {
+    const link = document.getElementById('referral-link');
+    link.select();
+    navigator.clipboard.writeText(link.value);
+    alert("Referral link copied to clipboard!");
+});
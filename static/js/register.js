@@ -0,0 +1,54 @@
+// Check availability once typing pauses, cancelling any lookup for an older value
+function debounce(fn, ms) {
+    let timer;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn(...args), ms);
+    };
+}
+
+function watchAvailability(field, shouldCheck, takenMessage, availableMessage) {
+    const input = document.getElementById(field);
+    const availability = document.getElementById(field + '-availability');
+    let lastChecked = null;
+    let controller = null;
+
+    input.addEventListener('input', debounce(() => {
+        const value = input.value;
+        if(!shouldCheck(value) || value === lastChecked) {
+            return;
+        }
+        lastChecked = value;
+
+        if(controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        fetch(`/api/check_${field}?${field}=${encodeURIComponent(value)}`, {signal: controller.signal})
+            .then(response => response.json())
+            .then(data => {
+                if(data.exists) {
+                    availability.textContent = takenMessage;
+                    availability.style.color = 'red';
+                } else {
+                    availability.textContent = availableMessage;
+                    availability.style.color = 'green';
+                }
+            })
+            .catch(error => {
+                if(error.name !== 'AbortError') {
+                    // Let the next pause retry this value
+                    if(lastChecked === value) {
+                        lastChecked = null;
+                    }
+                    throw error;
+                }
+            });
+    }, 400));
+}
+
+// Check username availability
+watchAvailability('username', value => value.length > 3, 'Username already taken', 'Username available');
+
+// Check email availability
+watchAvailability('email', value => value.includes('@'), 'Email already registered', 'Email available');
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before it is imported
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'yellowmoney.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as yellowmoney
+
+
+@pytest.fixture
+def app():
+    yellowmoney.app.config['TESTING'] = True
+    yield yellowmoney.app
+    with yellowmoney.app.app_context():
+        yellowmoney.db.session.remove()
+        yellowmoney.db.drop_all()
+        yellowmoney.db.create_all()
+    yellowmoney.cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    def register(username, referral_code=''):
+        client.post('/register', data={
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'secret',
+            'phone': '0240000000',
+            'referral_code': referral_code
+        })
+        with yellowmoney.app.app_context():
+            return yellowmoney.User.query.filter_by(username=username).one()
+    return register
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+import app as yellowmoney
+from app import db, User, Investment, Transaction, Payout
+
+
+def counters(user_id):
+    user = db.session.get(User, user_id)
+    return user.balance_cache, user.referral_earnings_cache, user.total_invested_cache
+
+
+def summed_totals(user_id):
+    balance = db.session.query(func.coalesce(func.sum(Payout.amount), 0)).join(
+        Investment, Investment.id == Payout.investment_id
+    ).filter(Investment.user_id == user_id).scalar()
+    referral_earnings = db.session.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
+        Transaction.user_id == user_id, Transaction.type == 'referral', Transaction.status == 'completed'
+    ).scalar()
+    total_invested = db.session.query(func.coalesce(func.sum(Investment.amount), 0)).filter(
+        Investment.user_id == user_id, Investment.active == True
+    ).scalar()
+    return balance, referral_earnings, total_invested
+
+
+def invest_and_pay(client, plan):
+    client.post('/invest', data={'plan': plan, 'amount': plan})
+    with yellowmoney.app.app_context():
+        transaction_id = db.session.query(func.max(Transaction.id)).filter_by(type='deposit').scalar()
+    client.post(f'/payment/{transaction_id}', data={'payment_method': 'mtn'})
+
+
+def test_invest_adds_to_total_invested(app, client, register):
+    user = register('investor')
+    client.post('/invest', data={'plan': '10', 'amount': '10'})
+    client.post('/invest', data={'plan': '5', 'amount': '5'})
+    
+    with app.app_context():
+        assert counters(user.id)[2] == 15
+        assert counters(user.id) == summed_totals(user.id)
+
+
+def test_payment_credits_referrer_once(app, client, register):
+    referrer = register('referrer')
+    client.get('/logout')
+    investor = register('investor', referrer.referral_code)
+    invest_and_pay(client, '20')
+    
+    # Paying the same transaction again must not pay the bonus twice
+    with app.app_context():
+        transaction_id = Transaction.query.filter_by(type='deposit').one().id
+    client.post(f'/payment/{transaction_id}', data={'payment_method': 'mtn'})
+    
+    with app.app_context():
+        assert counters(referrer.id)[1] == 20 * 0.05
+        assert counters(referrer.id) == summed_totals(referrer.id)
+        assert counters(investor.id) == summed_totals(investor.id)
+
+
+def test_payouts_add_to_balance(app, client, register):
+    user = register('investor')
+    invest_and_pay(client, '50')
+    invest_and_pay(client, '10')
+    
+    with app.app_context():
+        Investment.query.update({Investment.start_date: datetime.utcnow() - timedelta(days=8)})
+        db.session.commit()
+    yellowmoney.process_weekly_payouts()
+    # Nothing is due again until a week after the last payout
+    yellowmoney.process_weekly_payouts()
+    
+    with app.app_context():
+        assert counters(user.id)[0] == 50 * 0.01 + 10 * 0.01
+        assert counters(user.id) == summed_totals(user.id)
+
+
+def test_migration_backfills_counters(app, client, register):
+    referrer = register('referrer')
+    client.get('/logout')
+    investor = register('investor', referrer.referral_code)
+    invest_and_pay(client, '20')
+    
+    with app.app_context():
+        Investment.query.update({Investment.start_date: datetime.utcnow() - timedelta(days=8)})
+        db.session.commit()
+    yellowmoney.process_weekly_payouts()
+    
+    # Recreate a database from before the counter columns existed
+    with app.app_context():
+        db.session.remove()
+        with db.engine.begin() as conn:
+            for column in ('balance_cache', 'referral_earnings_cache', 'total_invested_cache'):
+                conn.execute(text(f'ALTER TABLE "user" DROP COLUMN {column}'))
+        yellowmoney.migrate_schema()
+        yellowmoney.migrate_schema()
+        
+        for user_id in (referrer.id, investor.id):
+            assert counters(user_id) == summed_totals(user_id)
+        assert counters(investor.id)[0] > 0
+        assert counters(referrer.id)[1] > 0
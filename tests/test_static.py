@@ -0,0 +1,51 @@
+import gzip
+
+import brotli
+
+from app import minify_css
+
+ASSET = '/static/css/app.css'
+
+
+def minified_asset(app):
+    with open(f'{app.static_folder}/css/app.css') as f:
+        return minify_css(f.read()).encode()
+
+
+def test_every_encoding_serves_the_minified_body(app, client):
+    decoders = {'br': brotli.decompress, 'gzip': gzip.decompress, 'identity': lambda data: data}
+    etags = set()
+    for encoding, decode in decoders.items():
+        response = client.get(ASSET, headers={'Accept-Encoding': encoding})
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding', 'identity') == encoding
+        assert decode(response.data) == minified_asset(app)
+        etags.add(response.headers['ETag'])
+    assert len(etags) == len(decoders)
+
+
+def test_suffixed_etag_revalidates(client):
+    for encoding in ('br', 'gzip', 'identity'):
+        headers = {'Accept-Encoding': encoding}
+        etag = client.get(ASSET, headers=headers).headers['ETag']
+        response = client.get(ASSET, headers=dict(headers, **{'If-None-Match': etag}))
+        assert response.status_code == 304
+        assert response.data == b''
+
+
+def test_stale_etag_gets_the_full_body(client):
+    response = client.get(ASSET, headers={'Accept-Encoding': 'br', 'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+    assert response.data
+
+
+def test_range_requests_get_the_whole_minified_body(app, client):
+    full = client.get(ASSET, headers={'Accept-Encoding': 'identity'})
+    assert 'Accept-Ranges' not in full.headers
+    
+    for range_header in ('bytes=0-10', 'bytes=99999-'):
+        response = client.get(ASSET, headers={'Accept-Encoding': 'identity', 'Range': range_header})
+        assert response.status_code == 200
+        assert 'Content-Range' not in response.headers
+        assert response.data == minified_asset(app)
+        assert response.headers['ETag'] == full.headers['ETag']